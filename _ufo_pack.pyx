@@ -0,0 +1,33 @@
+# cython: language_level=3
+"""Compiled drop-in for ufo_protocol.build_analog_with_flags.
+
+Build in place with: cythonize -i _ufo_pack.pyx
+"""
+
+from cpython.bytes cimport PyBytes_FromStringAndSize
+
+
+def pack9(
+    unsigned char c1,
+    unsigned char c2,
+    unsigned char thr,
+    unsigned char c4,
+    unsigned char flags=0,
+):
+    """
+    Build 9-byte control packet:
+      03 66 c1 c2 thr c4 flags chk 99
+
+    Out-of-range arguments raise OverflowError on conversion.
+    """
+    cdef unsigned char buf[9]
+    buf[0] = 0x03
+    buf[1] = 0x66
+    buf[2] = c1
+    buf[3] = c2
+    buf[4] = thr
+    buf[5] = c4
+    buf[6] = flags
+    buf[7] = c1 ^ c2 ^ thr ^ c4 ^ flags
+    buf[8] = 0x99
+    return PyBytes_FromStringAndSize(<char*>buf, 9)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import itertools
+
+import pytest
+
+import ufo_protocol
+
+_ufo_pack = pytest.importorskip("_ufo_pack")
+
+
+@pytest.mark.parametrize(
+    "centers",
+    [
+        (0x80, 0x80, 0x00, 0x80),
+        (0x00, 0xFF, 0x80, 0x7F),
+        (0x01, 0x02, 0x03, 0xFE),
+    ],
+)
+def test_pack9_matches_struct_packer_on_every_table_key(centers):
+    table = ufo_protocol.build_analog_table(*centers)
+    for key in table:
+        assert _ufo_pack.pack9(*key) == ufo_protocol._build_analog_with_flags_py(*key)
+
+
+def test_pack9_matches_struct_packer_exhaustively_per_axis():
+    for v, flags in itertools.product(range(256), (0x00, 0x01)):
+        for key in (
+            (v, 0x80, 0x00, 0x80, flags),
+            (0x80, v, 0x00, 0x80, flags),
+            (0x80, 0x80, v, 0x80, flags),
+            (0x80, 0x80, 0x00, v, flags),
+        ):
+            assert _ufo_pack.pack9(*key) == ufo_protocol._build_analog_with_flags_py(*key)
+
+
+def test_pack9_default_flags_is_zero():
+    assert _ufo_pack.pack9(1, 2, 3, 4) == _ufo_pack.pack9(1, 2, 3, 4, 0)
+
+
+def test_pack9_rejects_out_of_range():
+    with pytest.raises(OverflowError):
+        _ufo_pack.pack9(256, 0, 0, 0)
+    with pytest.raises(OverflowError):
+        _ufo_pack.pack9(-1, 0, 0, 0)
+
+
+def test_protocol_uses_compiled_packer():
+    assert ufo_protocol.build_analog_with_flags is _ufo_pack.pack9
@@ -39,7 +39,7 @@ class Args:
     quiet: bool
 
 
-def parse_args(argv: list[str]) -> Args:
+def _build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(
         description=HELP_TEXT,
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -65,7 +65,14 @@ def parse_args(argv: list[str]) -> Args:
     p.add_argument("--yaw-delta", type=int, default=35, help="Arrow left/right offset")
     p.add_argument("--thr-delta", type=int, default=35, help="Arrow up/down offset")
     p.add_argument("--quiet", action="store_true")
-    a = p.parse_args(argv)
+    return p
+
+
+_PARSER = _build_parser()
+
+
+def parse_args(argv: list[str]) -> Args:
+    a = _PARSER.parse_args(argv)
 
     if a.rate_hz <= 0:
         raise SystemExit("--rate-hz must be > 0")
@@ -77,21 +84,5 @@ def parse_args(argv: list[str]) -> Args:
     for v in (a.c1_center, a.c2_center, a.c4_center, a.thr_base):
         u8(int(v))
 
-    return Args(
-        dst_ip=a.dst_ip,
-        dst_port=int(a.dst_port),
-        bind_ip=a.bind_ip,
-        bind_port=int(a.bind_port),
-        rate_hz=float(a.rate_hz),
-        send_keepalive=bool(a.send_keepalive),
-        keepalive_hz=float(a.keepalive_hz),
-        hold_ms=int(a.hold_ms),
-        c1_center=int(a.c1_center),
-        c2_center=int(a.c2_center),
-        c4_center=int(a.c4_center),
-        thr_base=int(a.thr_base),
-        stick_delta=int(a.stick_delta),
-        yaw_delta=int(a.yaw_delta),
-        thr_delta=int(a.thr_delta),
-        quiet=bool(a.quiet),
-    )
+    # argparse has already applied each option's type; dest names match the fields.
+    return Args(**vars(a))
@@ -1,149 +1,187 @@
 from __future__ import annotations
 
+import heapq
 import socket
 import sys
+import threading
 import time
+from array import array
+from collections import deque
 
 from ufo_config import Args, parse_args
-from ufo_input_windows import read_key
+from ufo_input_windows import start_key_reader
 from ufo_protocol import (
     KEEPALIVE_0101,
-    axis_to_extreme,
-    build_analog_with_flags,
-    clamp_u8,
+    axis_lut,
+    build_analog_table,
 )
 
+# Bit position of each held key in the per-tick key mask. Every axis owns two
+# adjacent bits, positive direction first, so (mask >> shift) & 3 indexes the
+# table returned by axis_lut().
+KEY_INDEX = {
+    "w": 0,
+    "s": 1,
+    "d": 2,
+    "a": 3,
+    "up": 4,
+    "down": 5,
+    "right": 6,
+    "left": 7,
+}
 
-def send_takeoff_burst(
-    sock: socket.socket,
-    dst: tuple[str, int],
-    args: Args,
-    duration_s: float = 1.0,
-) -> None:
-    """Send fastFly flag packets for a short duration."""
-    t_takeoff_end = time.monotonic() + duration_s
-    takeoff_period = 1.0 / args.rate_hz
-    next_takeoff = time.monotonic()
-    while True:
-        now = time.monotonic()
-        if now >= t_takeoff_end:
-            break
-        if now >= next_takeoff:
-            pkt = build_analog_with_flags(
-                args.c1_center,
-                args.c2_center,
-                args.thr_base,
-                args.c4_center,
-                0x01,
-            )
-            sock.sendto(pkt, dst)
-            next_takeoff += takeoff_period
-        else:
-            time.sleep(max(0.0, min(0.01, next_takeoff - now)))
+# Key events handled per loop iteration; any backlog (paste, auto-repeat
+# flood) is picked up on the next iteration so sends stay on schedule.
+KEY_DRAIN_MAX = 32
+
+# Timer callbacks fired per wakeup; after a stall the overdue ticks are
+# spread over later iterations so key handling (and Q) is never starved.
+TIMER_FIRE_MAX = 32
+
+# Pending key events; the oldest are dropped if the control loop falls behind.
+KEY_QUEUE_LEN = 64
+
+# Send buffer with headroom for bursts behind other local traffic.
+SNDBUF_BYTES = 256 * 1024
+
+# DSCP EF (expedited forwarding) in the IPv4 TOS byte.
+TOS_DSCP_EF = 0xB8
+
+# Timestamp for a key that has never been pressed (or was reset).
+_NEVER_NS = -(1 << 62)
+
+# How long analog packets carry the fastFly flag after startup or E.
+TAKEOFF_NS = 1_000_000_000
 
 
 def run(args: Args) -> int:
     if sys.platform != "win32":
         raise SystemExit("send_ufo_keyboard.py currently supports Windows console only.")
 
-    hold_s = args.hold_ms / 1000.0
-    dst = (args.dst_ip, args.dst_port)
+    # Args is frozen; unpack what the loop reads once.
+    c1c, c2c, thrb, c4c = args.c1_center, args.c2_center, args.thr_base, args.c4_center
+    quiet = args.quiet
+    hold_ns = args.hold_ms * 1_000_000
+    pkt_cache = build_analog_table(c1c, c2c, thrb, c4c)
 
-    if not args.quiet:
+    if not quiet:
         print(f"dst={args.dst_ip}:{args.dst_port}")
         print(f"bind={args.bind_ip}:{args.bind_port}")
         print("controls: W/S c1, A/D c2, arrows thr/c4, E takeoff, R reset, Q/ESC quit")
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF_BYTES)
+    try:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, TOS_DSCP_EF)
+    except OSError:
+        # Marking is best effort; Windows may refuse or ignore it without a QoS policy.
+        pass
     sock.bind((args.bind_ip, args.bind_port))
-
-    if not args.quiet:
+    # Fixes the peer for send(); UDP connect() sends nothing on the wire.
+    sock.connect((args.dst_ip, args.dst_port))
+
+    t_last_ns = array("q", [_NEVER_NS] * len(KEY_INDEX))
+
+    c1_lut = axis_lut(c1c)
+    c2_lut = axis_lut(c2c)
+    thr_lut = axis_lut(thrb)
+    c4_lut = axis_lut(c4c)
+    neutral_pkt = pkt_cache[(c1c, c2c, thrb, c4c, 0x00)]
+    takeoff_pkt = pkt_cache[(c1c, c2c, thrb, c4c, 0x01)]
+
+    # At least 1ns, so an absurd rate cannot stall the timer heap on a 0 period.
+    analog_period_ns = max(1, round(1e9 / args.rate_hz))
+    ka_period_ns = max(1, round(1e9 / args.keepalive_hz)) if args.send_keepalive else None
+
+    keyq = deque(maxlen=KEY_QUEUE_LEN)
+    stop = threading.Event()
+    start_key_reader(keyq, stop)
+
+    # Hot-loop callables bound once as locals.
+    monotonic_ns = time.monotonic_ns
+    sleep = time.sleep
+    sock_send = sock.send
+    next_key = keyq.popleft
+    heapreplace = heapq.heapreplace
+
+    def send(pkt: bytes) -> None:
+        try:
+            sock_send(pkt)
+        except (ConnectionRefusedError, ConnectionResetError):
+            # A connected UDP socket reports the peer's ICMP port-unreachable
+            # on a later send; the drone may still be booting, so keep going.
+            pass
+
+    def send_analog(now_ns: int) -> None:
+        if now_ns < fastfly_until_ns:
+            # Takeoff sends neutral sticks with fastFly; held keys apply afterwards.
+            send(takeoff_pkt)
+            return
+
+        mask = 0
+        for i, t_ns in enumerate(t_last_ns):
+            mask |= ((now_ns - t_ns) <= hold_ns) << i
+
+        if mask == 0:
+            send(neutral_pkt)
+            return
+        c1 = c1_lut[mask & 3]
+        c2 = c2_lut[(mask >> 2) & 3]
+        c4 = c4_lut[(mask >> 6) & 3]
+        # W forces full throttle regardless of the arrow keys.
+        thr = 0xFF if mask & 1 else thr_lut[(mask >> 4) & 3]
+        send(pkt_cache[(c1, c2, thr, c4, 0x00)])
+
+    def send_keepalive(now_ns: int) -> None:
+        send(KEEPALIVE_0101)
+
+    t0_ns = monotonic_ns()
+
+    # (deadline_ns, seq, period_ns, callback); seq breaks deadline ties.
+    timers = [(t0_ns, 0, analog_period_ns, send_analog)]
+    if ka_period_ns is not None:
+        timers.append((t0_ns, 1, ka_period_ns, send_keepalive))
+    heapq.heapify(timers)
+
+    if not quiet:
         print("auto-takeoff: sending fastFly flag for 1.0s")
-    send_takeoff_burst(sock, dst, args, duration_s=1.0)
-
-    t_last = {
-        "w": -1e9,
-        "a": -1e9,
-        "s": -1e9,
-        "d": -1e9,
-        "up": -1e9,
-        "down": -1e9,
-        "left": -1e9,
-        "right": -1e9,
-    }
-
-    def is_on(name: str, now: float) -> bool:
-        return (now - t_last[name]) <= hold_s
-
-    analog_period = 1.0 / args.rate_hz
-    ka_period = 1.0 / args.keepalive_hz if args.send_keepalive else None
-
-    t0 = time.monotonic()
-    next_analog = t0
-    next_ka = t0 if ka_period is not None else None
+    fastfly_until_ns = t0_ns + TAKEOFF_NS
 
     try:
         while True:
-            now = time.monotonic()
+            now_ns = monotonic_ns()
 
-            while True:
-                k = read_key()
-                if k is None:
+            for _ in range(KEY_DRAIN_MAX):
+                if not keyq:
                     break
+                t_key_ns, k = next_key()
                 if k == "quit":
                     return 0
                 if k == "e":
-                    if not args.quiet:
+                    if not quiet:
                         print("takeoff: sending fastFly burst for 1.0s")
-                    send_takeoff_burst(sock, dst, args, duration_s=1.0)
+                    fastfly_until_ns = t_key_ns + TAKEOFF_NS
                     continue
                 if k == "r":
-                    for key in t_last:
-                        t_last[key] = -1e9
+                    for i in range(len(t_last_ns)):
+                        t_last_ns[i] = _NEVER_NS
                     continue
-                t_last[k] = now
-
-            did = False
-            if now >= next_analog:
-                w_on = is_on("w", now)
-                s_on = is_on("s", now)
-                a_on = is_on("a", now)
-                d_on = is_on("d", now)
-                up_on = is_on("up", now)
-                down_on = is_on("down", now)
-                left_on = is_on("left", now)
-                right_on = is_on("right", now)
-
-                c1 = axis_to_extreme(w_on, s_on, args.c1_center)
-                c2 = axis_to_extreme(d_on, a_on, args.c2_center)
-                c4 = axis_to_extreme(right_on, left_on, args.c4_center)
-
-                if w_on:
-                    thr = 0xFF
-                else:
-                    thr = axis_to_extreme(up_on, down_on, args.thr_base)
-
-                pkt = build_analog_with_flags(
-                    clamp_u8(c1),
-                    clamp_u8(c2),
-                    clamp_u8(thr),
-                    clamp_u8(c4),
-                    0x00,
-                )
-                sock.sendto(pkt, dst)
-                next_analog += analog_period
-                did = True
-
-            if next_ka is not None and now >= next_ka:
-                sock.sendto(KEEPALIVE_0101, dst)
-                next_ka += ka_period
-                did = True
-
-            if not did:
-                t_next = next_analog if next_ka is None else min(next_analog, next_ka)
-                time.sleep(max(0.0, min(0.01, t_next - now)))
+                t_last_ns[KEY_INDEX[k]] = t_key_ns
+
+            deadline_ns = timers[0][0]
+            if now_ns < deadline_ns:
+                sleep((deadline_ns - now_ns) / 1e9)
+                continue
+
+            for _ in range(TIMER_FIRE_MAX):
+                deadline_ns, seq, period_ns, callback = timers[0]
+                if deadline_ns > now_ns:
+                    break
+                heapreplace(timers, (deadline_ns + period_ns, seq, period_ns, callback))
+                callback(now_ns)
     finally:
+        stop.set()
         sock.close()
 
 
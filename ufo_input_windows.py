@@ -1,60 +1,211 @@
 from __future__ import annotations
 
+import ctypes
 import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
 
 if sys.platform == "win32":
     import msvcrt
+
+    KERNEL32 = ctypes.windll.kernel32
 else:
     msvcrt = None
+    KERNEL32 = None
+
+INFINITE = 0xFFFFFFFF
+WAIT_OBJECT_0 = 0x00000000
+KEY_EVENT = 0x0001
+
+# Longest the key reader thread blocks before rechecking its stop flag.
+KEY_WAIT_S = 0.1
+
+# Second char after the \x00 / \xe0 extended-key prefix.
+EXT_MAP = {
+    "H": "up",
+    "P": "down",
+    "K": "left",
+    "M": "right",
+}
+
+# Final char of an ESC [ / ESC O arrow sequence.
+ANSI_MAP = {
+    "A": "up",
+    "B": "down",
+    "C": "right",
+    "D": "left",
+}
+
+UNI_MAP = {
+    "↑": "up",
+    "↓": "down",
+    "←": "left",
+    "→": "right",
+}
+
+# Every single-char key, unicode arrows included.
+CHAR_MAP = {
+    **UNI_MAP,
+    "q": "quit",
+    "Q": "quit",
+    "e": "e",
+    "E": "e",
+    "r": "r",
+    "R": "r",
+    "w": "w",
+    "W": "w",
+    "a": "a",
+    "A": "a",
+    "s": "s",
+    "S": "s",
+    "d": "d",
+    "D": "d",
+}
+
+
+def _stdin_handle() -> int | None:
+    """Return the stdin console handle, or None if stdin is not a console."""
+    try:
+        handle = msvcrt.get_osfhandle(sys.stdin.fileno())
+    except (AttributeError, OSError, ValueError):
+        return None
+    mode = ctypes.c_uint32()
+    if not KERNEL32.GetConsoleMode(ctypes.c_void_p(handle), ctypes.byref(mode)):
+        return None
+    return handle
+
+
+class _KeyEventRecord(ctypes.Structure):
+    _fields_ = [
+        ("bKeyDown", ctypes.c_int32),
+        ("wRepeatCount", ctypes.c_uint16),
+        ("wVirtualKeyCode", ctypes.c_uint16),
+        ("wVirtualScanCode", ctypes.c_uint16),
+        ("UnicodeChar", ctypes.c_uint16),
+        ("dwControlKeyState", ctypes.c_uint32),
+    ]
+
+
+class _InputRecord(ctypes.Structure):
+    # INPUT_RECORD; only the KEY_EVENT arm of the event union is decoded, and
+    # it is as large as the biggest arm, so the record size still matches.
+    _fields_ = [
+        ("EventType", ctypes.c_uint16),
+        ("KeyEvent", _KeyEventRecord),
+    ]
+
 
+def _discard_ignored_events(h: ctypes.c_void_p) -> None:
+    """
+    Consume leading console events that getwch() would skip anyway.
 
-def read_key() -> str | None:
-    """Return normalized key tokens: w/a/s/d/up/down/left/right/e/r/quit."""
+    Key-up, focus, mouse and menu events, and key-downs that produce no
+    character (Shift, Ctrl, ...), all signal the handle; left in place they
+    make every following wait return at once. Only the head record is ever
+    read, after peeking it, so a character typed meanwhile is never lost.
+    """
+    rec = _InputRecord()
+    n = ctypes.c_uint32()
+    while KERNEL32.PeekConsoleInputW(h, ctypes.byref(rec), 1, ctypes.byref(n)) and n.value:
+        if rec.EventType == KEY_EVENT and rec.KeyEvent.bKeyDown:
+            if rec.KeyEvent.UnicodeChar:
+                return
+            # Extended keys (arrows) also have no character; kbhit() tells us
+            # whether anything still queued is readable by getwch().
+            if msvcrt.kbhit():
+                return
+        KERNEL32.ReadConsoleInputW(h, ctypes.byref(rec), 1, ctypes.byref(n))
+
+
+def _wait_for_input_poll(timeout_s: float | None) -> None:
+    """Fallback when stdin has no waitable OS handle: sleep in short slices."""
+    time.sleep(0.01 if timeout_s is None else min(0.01, timeout_s))
+
+
+def wait_for_input(timeout_s: float | None) -> None:
+    """
+    Block until console input is pending or timeout_s elapses (None = forever).
+
+    Returns early on any console event; callers still drain read_key().
+    """
     if msvcrt is None:
         raise RuntimeError("Keyboard polling is supported on Windows console only.")
 
-    if not msvcrt.kbhit():
+    handle = _stdin_handle()
+    if handle is None:
+        _wait_for_input_poll(timeout_s)
+        return
+
+    h = ctypes.c_void_p(handle)
+    timeout_ms = INFINITE if timeout_s is None else int(timeout_s * 1000)
+    if KERNEL32.WaitForSingleObject(h, timeout_ms) == WAIT_OBJECT_0:
+        _discard_ignored_events(h)
+
+
+def read_key(
+    _kbhit: Callable[[], bool] | None = msvcrt.kbhit if msvcrt is not None else None,
+    _getwch: Callable[[], str] | None = msvcrt.getwch if msvcrt is not None else None,
+    _ext: dict[str, str] = EXT_MAP,
+    _ansi: dict[str, str] = ANSI_MAP,
+    _chars: dict[str, str] = CHAR_MAP,
+) -> str | None:
+    """
+    Return normalized key tokens: w/a/s/d/up/down/left/right/e/r/quit.
+
+    The underscore parameters are bound at definition time so the lookups
+    are local; callers never pass them.
+    """
+    if _kbhit is None:
+        raise RuntimeError("Keyboard polling is supported on Windows console only.")
+
+    if not _kbhit():
         return None
 
-    ch = msvcrt.getwch()
+    ch = _getwch()
     if ch in ("\x00", "\xe0"):
-        ext = msvcrt.getwch()
-        return {
-            "H": "up",
-            "P": "down",
-            "K": "left",
-            "M": "right",
-        }.get(ext)
+        return _ext.get(_getwch())
 
     if ch == "\x1b":
-        if msvcrt.kbhit():
-            ch2 = msvcrt.getwch()
-            if ch2 in ("[", "O") and msvcrt.kbhit():
-                ch3 = msvcrt.getwch()
-                return {
-                    "A": "up",
-                    "B": "down",
-                    "C": "right",
-                    "D": "left",
-                }.get(ch3)
+        if _kbhit():
+            ch2 = _getwch()
+            if ch2 in ("[", "O") and _kbhit():
+                return _ansi.get(_getwch())
         return "quit"
 
-    if ch in ("↑", "↓", "←", "→"):
-        return {
-            "↑": "up",
-            "↓": "down",
-            "←": "left",
-            "→": "right",
-        }[ch]
+    return _chars.get(ch)
 
-    if ch in ("q", "Q"):
-        return "quit"
-    if ch in ("e", "E"):
-        return "e"
-    if ch in ("r", "R"):
-        return "r"
-
-    c = ch.lower()
-    if c in ("w", "a", "s", "d"):
-        return c
-    return None
+
+def start_key_reader(
+    keyq: deque,
+    stop: threading.Event,
+) -> threading.Thread:
+    """
+    Read keys on a daemon thread until stop is set.
+
+    Each key is appended to keyq as (time.monotonic_ns(), token); deque.append
+    is atomic, so the consumer needs no lock. If the thread dies before stop
+    is set, it queues a final "quit" so the controller does not keep flying
+    without keyboard input.
+    """
+
+    def pump() -> None:
+        stopped = stop.is_set
+        append = keyq.append
+        monotonic_ns = time.monotonic_ns
+        try:
+            while not stopped():
+                wait_for_input(KEY_WAIT_S)
+                while True:
+                    k = read_key()
+                    if k is None:
+                        break
+                    append((monotonic_ns(), k))
+        finally:
+            if not stopped():
+                append((monotonic_ns(), "quit"))
+
+    t = threading.Thread(target=pump, name="ufo-keys", daemon=True)
+    t.start()
+    return t
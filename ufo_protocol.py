@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import itertools
+import struct
+
 # Keepalive packet observed in controller traffic.
 KEEPALIVE_0101 = bytes([0x01, 0x01])
 
+_PACK9 = struct.Struct(">9B").pack
+
 
 def u8(x: int) -> int:
     if not (0 <= x <= 255):
@@ -10,23 +15,18 @@ def u8(x: int) -> int:
     return x
 
 
-def clamp_u8(x: int) -> int:
-    return 0 if x < 0 else (255 if x > 255 else x)
-
-
-def axis_to_extreme(pos_on: bool, neg_on: bool, center: int) -> int:
+def axis_lut(center: int) -> tuple[int, int, int, int]:
     """
-    Convert digital key states to axis byte.
-      - pos only -> 0xFF
-      - neg only -> 0x00
-      - both/none -> center
+    Axis byte lookup table for a pair of digital keys, indexed by
+    pos_on | (neg_on << 1):
+      - none      -> center
+      - pos only  -> 0xFF
+      - neg only  -> 0x00
+      - both      -> center
+
+    center is expected to be validated already (see ufo_config.parse_args).
     """
-    center = u8(center)
-    if pos_on and not neg_on:
-        return 0xFF
-    if neg_on and not pos_on:
-        return 0x00
-    return center
+    return (center, 0xFF, 0x00, center)
 
 
 def build_analog_with_flags(c1: int, c2: int, thr: int, c4: int, flags: int = 0) -> bytes:
@@ -36,11 +36,45 @@ def build_analog_with_flags(c1: int, c2: int, thr: int, c4: int, flags: int = 0)
 
     Checksum:
       chk = c1 ^ c2 ^ thr ^ c4 ^ flags
+
+    Inputs are not re-validated here; validate once where they enter (see
+    build_analog_table). Values outside 0..255 still fail, via the checksum
+    assert or struct.error from the packer.
+    """
+    chk = c1 ^ c2 ^ thr ^ c4 ^ flags
+    assert 0 <= chk <= 255, chk
+    return _PACK9(0x03, 0x66, c1, c2, thr, c4, flags, chk, 0x99)
+
+
+# Pure-Python packer, kept reachable when the compiled one replaces it.
+_build_analog_with_flags_py = build_analog_with_flags
+
+try:
+    # Optional compiled packer (cythonize -i _ufo_pack.pyx); same output.
+    from _ufo_pack import pack9 as build_analog_with_flags  # noqa: F811
+except ImportError:
+    pass
+
+
+def build_analog_table(
+    c1_center: int, c2_center: int, thr_base: int, c4_center: int
+) -> dict[tuple[int, int, int, int, int], bytes]:
+    """
+    Precompute every control packet reachable from digital key input.
+
+    Each axis is only ever 0x00, 0xFF or its center, and flags is 0x00 or
+    0x01, so at most 3*3*3*3*2 = 162 packets exist. Keyed by
+    (c1, c2, thr, c4, flags).
     """
-    c1 = u8(c1)
-    c2 = u8(c2)
-    thr = u8(thr)
-    c4 = u8(c4)
-    flags = u8(flags)
-    chk = (c1 ^ c2 ^ thr ^ c4 ^ flags) & 0xFF
-    return bytes([0x03, 0x66, c1, c2, thr, c4, flags, chk, 0x99])
+    for v in (c1_center, c2_center, thr_base, c4_center):
+        u8(v)
+    table = {}
+    for c1, c2, thr, c4, flags in itertools.product(
+        {0x00, 0xFF, c1_center},
+        {0x00, 0xFF, c2_center},
+        {0x00, 0xFF, thr_base},
+        {0x00, 0xFF, c4_center},
+        (0x00, 0x01),
+    ):
+        table[(c1, c2, thr, c4, flags)] = build_analog_with_flags(c1, c2, thr, c4, flags)
+    return table